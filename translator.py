@@ -14,37 +14,70 @@
 
 import sys
 import os
+import re
+import operator
+from collections import namedtuple
+from functools import lru_cache
+
+# Длинная арифметика GMP, если установлен gmpy2; иначе обычные int Python.
+# Числа переводятся в mpz один раз - при построении листьев в парсере
+try:
+    from gmpy2 import mpz
+    _HAVE_GMP = True
+except ImportError:
+    _HAVE_GMP = False
 
 # =============================================
 # 1. СКАНЕР (Лексический анализатор)
 # =============================================
 
-class Token:
-    """Класс для представления токена"""
-    def __init__(self, type, value=None, line=None, col=None):
-        self.type = type      # тип токена: INT, POW, LPAREN, RPAREN, COMMA, PLUS, MULT, EOF, ERROR
-        self.value = value    # значение (для чисел)
-        self.line = line      # номер строки
-        self.col = col        # номер колонки
+# Группы: 1 - число, 2 - pow или одиночный символ, 3 - пробелы,
+# 4 - переводы строк, 5 - любой другой символ (ошибка).
+# Пробелы и переводы строк пропускаются целыми сериями за одно совпадение
+_TOKEN_RE = re.compile(r'(\d+)|(pow|[()+*,])|([ \t]+)|(\n+)|(.)', re.DOTALL)
+
+class Token(namedtuple('Token', 'type value line col', defaults=(None, None, None))):
+    """
+    Класс для представления токена (кортеж: тип, значение, строка, колонка).
+    Сканер создает токены через tuple.__new__(Token, (...)): это вызов на C,
+    тогда как Token(...) проходит через __new__, сгенерированный namedtuple на Python
+    """
+    __slots__ = ()
     
     def __repr__(self):
+        type_name = Scanner.type_name(self.type)
         if self.value is not None:
-            return f"Token({self.type}, {self.value}, line={self.line}, col={self.col})"
-        return f"Token({self.type}, line={self.line}, col={self.col})"
+            return f"Token({type_name}, {self.value}, line={self.line}, col={self.col})"
+        return f"Token({type_name}, line={self.line}, col={self.col})"
 
 class Scanner:
     """Сканер для преобразования потока символов в поток токенов"""
     
-    # Определение типов токенов
-    INT = 'INT'
-    POW = 'POW'
-    LPAREN = '('
-    RPAREN = ')'
-    COMMA = ','
-    PLUS = '+'
-    MULT = '*'
-    EOF = 'EOF'
-    ERROR = 'ERROR'
+    # Определение типов токенов (малые целые - сравнение дешевле, чем у строк)
+    INT, POW, LPAREN, RPAREN, COMMA, PLUS, MULT, EOF, ERROR = range(9)
+    
+    # Имена типов токенов для вывода и сообщений об ошибках
+    TYPE_NAMES = {
+        INT: 'INT',
+        POW: 'POW',
+        LPAREN: '(',
+        RPAREN: ')',
+        COMMA: ',',
+        PLUS: '+',
+        MULT: '*',
+        EOF: 'EOF',
+        ERROR: 'ERROR',
+    }
+    
+    # Таблица лексем фиксированного вида: текст -> тип токена
+    LEXEMES = {
+        'pow': POW,
+        '(': LPAREN,
+        ')': RPAREN,
+        ',': COMMA,
+        '+': PLUS,
+        '*': MULT,
+    }
     
     def __init__(self, source):
         self.source = source      # исходный текст
@@ -56,97 +89,107 @@ class Scanner:
     
     def scan(self):
         """Основной метод сканирования"""
-        while self.pos < len(self.source):
-            ch = self.source[self.pos]
+        line = 1                  # текущая строка
+        line_start = 0            # смещение начала текущей строки
+        
+        skip_until = 0            # конец серии цифр, уже разобранной вручную
+        
+        # Атрибуты, нужные в цикле, заранее связываются с локальными переменными
+        append = self.tokens.append
+        lexemes = self.LEXEMES
+        new_token = tuple.__new__
+        token_cls = Token
+        int_type = self.INT
+        error_type = self.ERROR
+        
+        # Весь разбор выполняется одним проходом регулярного выражения,
+        # ветка выбирается по номеру сработавшей группы
+        for m in _TOKEN_RE.finditer(self.source):
+            kind = m.lastindex
             
             # Пропускаем пробельные символы
-            if ch in ' \t':
-                self.pos += 1
-                self.col += 1
+            if kind == 3:
                 continue
             
-            # Обработка новой строки
-            if ch == '\n':
-                self.pos += 1
-                self.line += 1
-                self.col = 1
+            # Обработка серии переводов строки
+            if kind == 4:
+                line_start = m.end()
+                line += line_start - m.start()
                 continue
             
+            col = m.start() - line_start + 1
+            
+            # Ключевое слово pow и одиночные символы - одним поиском по таблице
+            if kind == 2:
+                append(new_token(token_cls, (lexemes[m[2]], None, line, col)))
+            
             # Распознавание чисел
-            if ch.isdigit():
-                start_col = self.col
-                num_str = ''
-                while self.pos < len(self.source) and self.source[self.pos].isdigit():
-                    num_str += self.source[self.pos]
-                    self.pos += 1
-                    self.col += 1
+            elif kind == 1:
+                if m.start() < skip_until:
+                    continue
+                # Цепочка цифр уже выделена регулярным выражением - одно преобразование int()
+                # (знак в записи числа невозможен, поэтому проверка на отрицательность не нужна)
+                num_str = m[1]
                 try:
-                    value = int(num_str)
-                    if value < 0:
-                        self._add_error(f"Отрицательное число: {value}", self.line, start_col)
-                        self.tokens.append(Token(self.ERROR, value, self.line, start_col))
-                    else:
-                        self.tokens.append(Token(self.INT, value, self.line, start_col))
+                    append(new_token(token_cls, (int_type, int(num_str), line, col)))
                 except ValueError:
-                    self._add_error(f"Некорректное число: {num_str}", self.line, start_col)
-                    self.tokens.append(Token(self.ERROR, num_str, self.line, start_col))
-                continue
+                    # Слишком длинная запись числа (ограничение int_max_str_digits)
+                    self._add_error(f"Некорректное число: {num_str}", line, col)
+                    append(new_token(token_cls, (error_type, num_str, line, col)))
             
-            # Распознавание ключевого слова pow
-            if ch == 'p':
-                if self.pos + 2 < len(self.source) and self.source[self.pos:self.pos+3] == 'pow':
-                    self.tokens.append(Token(self.POW, None, self.line, self.col))
-                    self.pos += 3
-                    self.col += 3
+            # Неизвестный символ
+            else:
+                if m.start() < skip_until:
                     continue
-                else:
-                    self._add_error(f"Неизвестный идентификатор: {ch}", self.line, self.col)
-                    self.tokens.append(Token(self.ERROR, ch, self.line, self.col))
-                    self.pos += 1
-                    self.col += 1
+                ch = m[5]
+                if ch.isdigit():
+                    # Цифра вне \d (например, '²'): вся серия цифр вокруг нее - одно некорректное число
+                    skip_until = self._scan_bad_number(m.start(), line, line_start)
                     continue
-            
-            # Распознавание одиночных символов
-            if ch == '(':
-                self.tokens.append(Token(self.LPAREN, None, self.line, self.col))
-                self.pos += 1
-                self.col += 1
-                continue
-            
-            if ch == ')':
-                self.tokens.append(Token(self.RPAREN, None, self.line, self.col))
-                self.pos += 1
-                self.col += 1
-                continue
-            
-            if ch == ',':
-                self.tokens.append(Token(self.COMMA, None, self.line, self.col))
-                self.pos += 1
-                self.col += 1
-                continue
-            
-            if ch == '+':
-                self.tokens.append(Token(self.PLUS, None, self.line, self.col))
-                self.pos += 1
-                self.col += 1
-                continue
-            
-            if ch == '*':
-                self.tokens.append(Token(self.MULT, None, self.line, self.col))
-                self.pos += 1
-                self.col += 1
-                continue
-            
-            # Неизвестный символ
-            self._add_error(f"Неизвестный символ: '{ch}'", self.line, self.col)
-            self.tokens.append(Token(self.ERROR, ch, self.line, self.col))
-            self.pos += 1
-            self.col += 1
+                if ch == 'p':
+                    self._add_error(f"Неизвестный идентификатор: {ch}", line, col)
+                else:
+                    self._add_error(f"Неизвестный символ: '{ch}'", line, col)
+                append(new_token(token_cls, (error_type, ch, line, col)))
+        
+        self.pos = len(self.source)
+        self.line = line
+        self.col = self.pos - line_start + 1
         
         # Добавляем токен конца файла
-        self.tokens.append(Token(self.EOF, None, self.line, self.col))
+        append(new_token(token_cls, (self.EOF, None, self.line, self.col)))
         return self.tokens
     
+    def _scan_bad_number(self, pos, line, line_start):
+        """
+        Разбор серии символов str.isdigit(), содержащей цифру вне \d.
+        Начало серии, если оно уже выдано токеном числа, забирается обратно.
+        Возвращает смещение конца серии
+        """
+        source = self.source
+        start = pos
+        while start > line_start and source[start - 1].isdigit():
+            start -= 1
+        if start < pos:
+            token = self.tokens.pop()
+            if token.type == self.ERROR:
+                self.errors.pop()
+        
+        end = pos + 1
+        while end < len(source) and source[end].isdigit():
+            end += 1
+        
+        num_str = source[start:end]
+        col = start - line_start + 1
+        self._add_error(f"Некорректное число: {num_str}", line, col)
+        self.tokens.append(tuple.__new__(Token, (self.ERROR, num_str, line, col)))
+        return end
+    
+    @classmethod
+    def type_name(cls, token_type):
+        """Имя типа токена для вывода"""
+        return cls.TYPE_NAMES.get(token_type, token_type)
+    
     def _add_error(self, message, line, col):
         """Добавление ошибки сканера"""
         self.errors.append(f"[СКАНЕР] Строка {line}, позиция {col}: {message}")
@@ -160,15 +203,38 @@ class Scanner:
 # 2. ПАРСЕР (Синтаксический анализатор)
 # =============================================
 
+# Коды операций линейного (постфиксного) кода выражения.
+# OP_LOAD кладет на стек сохраненный результат общего поддерева (аргумент - номер ячейки)
+OP_PUSH, OP_ADD, OP_MUL, OP_POW, OP_LOAD = range(5)
+
+# Общие листья AST для малых чисел
+_SMALL_INT_LIMIT = 256
+_SMALL_INTS = [('INT', mpz(i) if _HAVE_GMP else i) for i in range(_SMALL_INT_LIMIT)]
+
+# Соответствие между типами узлов AST и кодами операций
+_NODE_OPCODES = {'INT': OP_PUSH, '+': OP_ADD, '*': OP_MUL, 'pow': OP_POW}
+_OPCODE_TYPES = ('INT', '+', '*', 'pow')
+
 class Parser:
     """Рекурсивный нисходящий предикативный распознаватель"""
     
-    def __init__(self, tokens):
+    # Бинарные операции: тип токена -> (приоритет, тип узла AST)
+    BINARY_OPS = {
+        Scanner.PLUS: (1, '+'),
+        Scanner.MULT: (2, '*'),
+    }
+    
+    def __init__(self, tokens, fold=True):
         self.tokens = tokens          # поток токенов
+        self.fold = fold              # свертка константных подвыражений при разборе
         self.pos = 0                  # текущая позиция в потоке токенов
         self.current_token = None     # текущий токен
         self.errors = []              # список синтаксических ошибок
         self.ast = None               # AST дерево
+        self.code = []                # линейный код: список пар (код операции, аргумент)
+        self._intern = {}             # таблица уже построенных узлов AST
+        self._code_index = {}         # id(внутренний узел) -> индекс его операции в self.code
+        self._slots = 0               # число ячеек для результатов общих поддеревьев
         self._advance()               # инициализация первого токена
     
     def _advance(self):
@@ -180,13 +246,16 @@ class Parser:
     
     def _match(self, expected_type):
         """Проверка соответствия текущего токена ожидаемому типу"""
-        if self.current_token.type == expected_type:
-            token = self.current_token
-            self._advance()
+        token = self.current_token
+        if token[0] == expected_type:
+            # Сдвиг без проверки границ: за любым токеном, кроме EOF, есть следующий
+            self.current_token = self.tokens[self.pos]
+            self.pos += 1
             return token
         else:
-            self._add_error(f"Ожидается {expected_type}, получен {self.current_token.type}", 
-                          self.current_token.line, self.current_token.col)
+            self._add_error(f"Ожидается {Scanner.type_name(expected_type)}, "
+                          f"получен {Scanner.type_name(token[0])}", 
+                          token[2], token[3])
             return None
     
     def _peek(self):
@@ -195,108 +264,113 @@ class Parser:
             return self.tokens[self.pos]
         return None
     
-    def _add_error(self, message, line, col):
-        """Добавление синтаксической ошибки"""
-        self.errors.append(f"[СИНТАКСИС] Строка {line}, позиция {col}: {message}")
-    
-    # ================= НЕТЕРМИНАЛЫ ГРАММАТИКИ =================
-    
-    def parse_expr(self):
+    def _leaf(self, value):
         """
-        <Expr> ::= <Sum>
+        Лист INT: запись в линейный код и общий кортеж для одинаковых чисел.
+        Малые числа берутся из заранее построенной таблицы без обращения к словарю.
+        Значение листа и аргумент PUSH - уже в представлении mpz, если доступен gmpy2
         """
-        return self.parse_sum()
+        if value < _SMALL_INT_LIMIT:
+            node = _SMALL_INTS[value]
+        else:
+            if _HAVE_GMP:
+                value = mpz(value)
+            node = ('INT', value)
+            node = self._intern.setdefault(node, node)
+        self.code.append((OP_PUSH, node[1]))
+        return node
     
-    def parse_sum(self):
+    def _node(self, node):
         """
-        <Sum> ::= <Prod> <SumTail>
+        Регистрация узла AST (hash-consing): одинаковые поддеревья
+        представляются одним и тем же кортежем.
+        Дети уже зарегистрированы, поэтому для внутренних узлов ключом
+        служат идентификаторы детей - без повторного хеширования поддеревьев.
+        Заодно узел записывается в линейный код, а операция над двумя
+        числами при включенной свертке сразу заменяется результатом.
+        Для повторного поддерева код не повторяется: его первая операция
+        сохраняет результат в ячейку, а повтор лишь загружает его (OP_LOAD)
         """
-        node = self.parse_prod()
-        if node is None:
-            return None
+        node_type = node[0]
+        if self.fold and node[1][0] == 'INT' and node[2][0] == 'INT':
+            result, error = _compute(node_type, node[1][1], node[2][1])
+            # При ошибке узел остается в дереве, чтобы о ней сообщил семантический анализ
+            if error is None:
+                del self.code[-2:]
+                return self._leaf(result)
         
-        sum_tail_node = self.parse_sum_tail()
-        if sum_tail_node is None:
+        key = (node_type, id(node[1]), id(node[2]))
+        shared = self._intern.get(key)
+        if shared is None:
+            self._code_index[id(node)] = len(self.code)
+            self.code.append((_NODE_OPCODES[node_type], None))
+            self._intern[key] = node
             return node
         
-        # Если есть SumTail, создаем узел для цепочки сложений
-        while sum_tail_node:
-            if sum_tail_node[0] == '+':
-                right = self.parse_prod()
-                if right is None:
-                    return None
-                node = ('+', node, right)
-                sum_tail_node = self.parse_sum_tail()
-            else:
-                break
-        
-        return node
+        # Дети повтора тоже общие (или листья), поэтому их код - ровно две
+        # последние записи, каждая из одной команды
+        del self.code[-2:]
+        index = self._code_index[id(shared)]
+        opcode, slot = self.code[index]
+        if slot is None:
+            slot = self._slots
+            self._slots += 1
+            self.code[index] = (opcode, slot)
+        self.code.append((OP_LOAD, slot))
+        return shared
     
-    def parse_sum_tail(self):
-        """
-        <SumTail> ::= "+" <Prod> <SumTail> | ε
-        Возвращает кортеж ('+',) если найден '+', иначе None
-        """
-        if self.current_token.type == Scanner.PLUS:
-            token = self._match(Scanner.PLUS)
-            if token is None:
-                return None
-            return ('+',)
-        return None
+    def _add_error(self, message, line, col):
+        """Добавление синтаксической ошибки"""
+        self.errors.append(f"[СИНТАКСИС] Строка {line}, позиция {col}: {message}")
     
-    def parse_prod(self):
+    # ================= НЕТЕРМИНАЛЫ ГРАММАТИКИ =================
+    
+    def parse_expr(self, min_prec=1):
         """
-        <Prod> ::= <Atom> <ProdTail>
+        <Expr> ::= <Sum>
+        <Sum> и <Prod> (вместе с <SumTail>, <ProdTail>) разбираются одним циклом
+        методом предшествования операций: '+' - приоритет 1, '*' - приоритет 2,
+        обе операции левоассоциативны
         """
+        binary_ops = self.BINARY_OPS
+        tokens = self.tokens
+        
         node = self.parse_atom()
         if node is None:
             return None
         
-        prod_tail_node = self.parse_prod_tail()
-        if prod_tail_node is None:
-            return node
-        
-        # Если есть ProdTail, создаем узел для цепочки умножений
-        while prod_tail_node:
-            if prod_tail_node[0] == '*':
-                right = self.parse_atom()
-                if right is None:
-                    return None
-                node = ('*', node, right)
-                prod_tail_node = self.parse_prod_tail()
-            else:
-                break
-        
-        return node
-    
-    def parse_prod_tail(self):
-        """
-        <ProdTail> ::= "*" <Atom> <ProdTail> | ε
-        Возвращает кортеж ('*',) если найден '*', иначе None
-        """
-        if self.current_token.type == Scanner.MULT:
-            token = self._match(Scanner.MULT)
-            if token is None:
+        while True:
+            op = binary_ops.get(self.current_token[0])
+            if op is None or op[0] < min_prec:
+                return node
+            prec, node_type = op
+            # Переход к следующему токену (за операцией всегда есть хотя бы EOF)
+            self.current_token = tokens[self.pos]
+            self.pos += 1
+            
+            # Правый операнд может содержать только операции с большим приоритетом
+            right = self.parse_expr(prec + 1)
+            if right is None:
                 return None
-            return ('*',)
-        return None
+            node = self._node((node_type, node, right))
     
     def parse_atom(self):
         """
         <Atom> ::= INT | "pow" "(" <Expr> "," <Expr> ")"
         """
+        token = self.current_token
+        token_type = token[0]
+        
         # Вариант 1: INT
-        if self.current_token.type == Scanner.INT:
-            token = self._match(Scanner.INT)
-            if token is None:
-                return None
-            return ('INT', token.value)
+        if token_type == Scanner.INT:
+            self.current_token = self.tokens[self.pos]
+            self.pos += 1
+            return self._leaf(token[1])
         
         # Вариант 2: "pow" "(" <Expr> "," <Expr> ")"
-        elif self.current_token.type == Scanner.POW:
-            pow_token = self._match(Scanner.POW)
-            if pow_token is None:
-                return None
+        elif token_type == Scanner.POW:
+            self.current_token = self.tokens[self.pos]
+            self.pos += 1
             
             if not self._match(Scanner.LPAREN):
                 return None
@@ -307,8 +381,9 @@ class Parser:
                 return None
             
             if not self._match(Scanner.COMMA):
+                token = self.current_token
                 self._add_error("Ожидается запятая между аргументами pow", 
-                              self.current_token.line, self.current_token.col)
+                              token[2], token[3])
                 return None
             
             # Второй аргумент
@@ -317,15 +392,16 @@ class Parser:
                 return None
             
             if not self._match(Scanner.RPAREN):
+                token = self.current_token
                 self._add_error("Ожидается закрывающая скобка ')'", 
-                              self.current_token.line, self.current_token.col)
+                              token[2], token[3])
                 return None
             
-            return ('pow', arg1, arg2)
+            return self._node(('pow', arg1, arg2))
         
         else:
-            self._add_error(f"Ожидается INT или pow, получен {self.current_token.type}", 
-                          self.current_token.line, self.current_token.col)
+            self._add_error(f"Ожидается INT или pow, получен {Scanner.type_name(token_type)}", 
+                          token[2], token[3])
             return None
     
     def parse(self):
@@ -335,9 +411,10 @@ class Parser:
         self.ast = self.parse_expr()
         
         # Проверяем, что достигли конца файла
-        if self.current_token.type != Scanner.EOF:
-            self._add_error(f"Неожиданный токен в конце: {self.current_token.type}", 
-                          self.current_token.line, self.current_token.col)
+        token = self.current_token
+        if token[0] != Scanner.EOF:
+            self._add_error(f"Неожиданный токен в конце: {Scanner.type_name(token[0])}", 
+                          token[2], token[3])
         
         return self.ast
     
@@ -350,16 +427,86 @@ class Parser:
 # 3. СЕМАНТИЧЕСКИЙ АНАЛИЗАТОР (Вычисление значения)
 # =============================================
 
+# Операции языка: тип узла -> (функция, "при ...", "результат ...", запись выражения)
+_OPS = {
+    '+': (operator.add, "сложении", "сложения", "{} + {}"),
+    '*': (operator.mul, "умножении", "умножения", "{} * {}"),
+    'pow': (pow, "возведении в степень", "pow", "pow({}, {})"),
+}
+
+def _compute(node_type, left_val, right_val):
+    """
+    Применение операции к значениям операндов с проверками языка.
+    Возвращает пару (значение, None) или (None, сообщение об ошибке)
+    """
+    op = _OPS.get(node_type)
+    if op is None:
+        return None, f"Неизвестный тип узла: {node_type}"
+    func, action, result_name, expr_format = op
+    
+    # Дополнительные проверки аргументов функции pow
+    if node_type == 'pow':
+        if left_val < 0 or right_val < 0:
+            return None, f"Отрицательные аргументы в pow: pow({left_val}, {right_val})"
+        if right_val > 1000:  # Практическое ограничение
+            return None, f"Слишком большая степень: {right_val}"
+    
+    try:
+        result = func(left_val, right_val)
+    except OverflowError:
+        return None, f"Переполнение при {action}: {expr_format.format(left_val, right_val)}"
+    if result < 0:  # В нашем языке только положительные числа
+        return None, f"Отрицательный результат {result_name}: {expr_format.format(left_val, right_val)}"
+    return result, None
+
+# Подписи внутренних узлов и готовые отступы для вывода AST
+_AST_LABELS = {'+': "ADD (+)", '*': "MULT (*)", 'pow': "POW"}
+_INDENTS = ["  " * i for i in range(64)]
+
+# Приоритеты операций Python для расстановки скобок при генерации кода
+_PY_PREC_ADD, _PY_PREC_MUL, _PY_PREC_POW, _PY_PREC_ATOM = range(1, 5)
+
+def _py_prec(node):
+    """Приоритет записи узла AST в тексте выражения Python"""
+    node_type = node[0]
+    if node_type == '+':
+        return _PY_PREC_ADD
+    if node_type == '*':
+        return _PY_PREC_MUL
+    if node_type == 'pow':
+        exponent = node[2]
+        if exponent[0] == 'INT' and exponent[1] <= 1000:
+            return _PY_PREC_POW
+    return _PY_PREC_ATOM
+
+def _checked_pow(base, exponent):
+    """pow с проверками языка для скомпилированного выражения"""
+    result, error = _compute('pow', base, exponent)
+    if error is not None:
+        raise ArithmeticError(error)
+    return result
+
+# Метка в стеке обхода SemanticAnalyzer._value: вычисляется правый потомок узла
+_RIGHT = object()
+
+@lru_cache(maxsize=1024)
+def _compile_expr(py_source):
+    """Код выражения Python; одинаковый текст компилируется один раз"""
+    return compile(py_source, '<expr>', 'eval')
+
 class SemanticAnalyzer:
     """Семантический анализатор для вычисления значения выражения"""
     
     def __init__(self, ast):
         self.ast = ast
         self.errors = []
+        self._memo = {}           # id(узел) -> (узел, значение) для уже вычисленных поддеревьев
     
     def evaluate(self, node=None):
         """
-        Рекурсивное вычисление значения AST
+        Вычисление значения AST.
+        Значение каждого узла вычисляется один раз: повторные поддеревья
+        (общие после hash-consing в парсере) берутся из таблицы
         """
         if node is None:
             node = self.ast
@@ -368,85 +515,175 @@ class SemanticAnalyzer:
             self.errors.append("[СЕМАНТИКА] Пустое AST дерево")
             return None
         
-        node_type = node[0]
-        
-        # Целое число
-        if node_type == 'INT':
-            return node[1]
-        
-        # Операция сложения
-        elif node_type == '+':
-            left_val = self.evaluate(node[1])
-            right_val = self.evaluate(node[2])
-            
-            if left_val is None or right_val is None:
-                return None
-            
-            # Проверка переполнения
-            try:
-                result = left_val + right_val
-                if result < 0:  # В нашем языке только положительные числа
-                    self.errors.append(f"[СЕМАНТИКА] Отрицательный результат сложения: {left_val} + {right_val}")
-                    return None
-                return result
-            except OverflowError:
-                self.errors.append(f"[СЕМАНТИКА] Переполнение при сложении: {left_val} + {right_val}")
-                return None
-        
-        # Операция умножения
-        elif node_type == '*':
-            left_val = self.evaluate(node[1])
-            right_val = self.evaluate(node[2])
-            
-            if left_val is None or right_val is None:
-                return None
+        result = self._value(node)
+        return None if result is None else int(result)
+    
+    def _value(self, node):
+        """
+        Значение узла с мемоизацией.
+        Обход в обратном порядке с явным стеком, поэтому глубина дерева
+        не ограничена пределом рекурсии. Спуск идет по левой ветви: каждый
+        внутренний узел один раз проверяется в таблице и один раз кладется
+        в стек. На подъеме узел вычисляется, как только готово значение
+        левого потомка и правый потомок - лист или уже вычислен; иначе в стек
+        кладутся значение слева, узел и метка _RIGHT, и спуск идет вправо.
+        Сам узел хранится рядом со значением, чтобы id освобожденного
+        кортежа не мог совпасть с id нового
+        """
+        memo = self._memo
+        errors = self.errors
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        current = node
+        while True:
+            # Спуск по левой ветви до листа, вычисленного или ошибочного узла
+            while True:
+                node_type = current[0]
+                if node_type == 'INT':
+                    value = current[1]
+                    break
+                entry = memo.get(id(current))
+                if entry is not None and entry[0] is current:
+                    value = entry[1]
+                    break
+                if node_type not in _OPS:
+                    errors.append(f"[СЕМАНТИКА] Неизвестный тип узла: {node_type}")
+                    memo[id(current)] = (current, None)
+                    value = None
+                    break
+                push(current)
+                current = current[1]
             
-            # Проверка переполнения
-            try:
-                result = left_val * right_val
-                if result < 0:  # В нашем языке только положительные числа
-                    self.errors.append(f"[СЕМАНТИКА] Отрицательный результат умножения: {left_val} * {right_val}")
-                    return None
-                return result
-            except OverflowError:
-                self.errors.append(f"[СЕМАНТИКА] Переполнение при умножении: {left_val} * {right_val}")
-                return None
+            # Подъем: value - значение только что вычисленного поддерева
+            while stack:
+                top = pop()
+                if top is _RIGHT:
+                    # Готов правый потомок; под меткой лежат узел и значение слева
+                    parent = pop()
+                    left_val = pop()
+                    right_val = value
+                else:
+                    # Готов левый потомок; правый нужно сначала вычислить, если это не лист
+                    parent = top
+                    left_val = value
+                    right = parent[2]
+                    if right[0] != 'INT':
+                        push(left_val)
+                        push(parent)
+                        push(_RIGHT)
+                        current = right
+                        break
+                    right_val = right[1]
+                
+                node_type = parent[0]
+                if left_val is None or right_val is None:
+                    value = None
+                # Сумма и произведение неотрицательных чисел не дают ошибок
+                elif node_type == '+':
+                    value = left_val + right_val
+                elif node_type == '*':
+                    value = left_val * right_val
+                else:
+                    value, error = _compute(node_type, left_val, right_val)
+                    if error is not None:
+                        errors.append(f"[СЕМАНТИКА] {error}")
+                memo[id(parent)] = (parent, value)
+            else:
+                return value
+    
+    def compile(self):
+        """
+        Вычисление через байткод Python: AST переводится в текст выражения,
+        который компилируется и выполняется интерпретатором CPython.
+        Код выражения кэшируется на уровне модуля по тексту, поэтому
+        повторная трансляция того же выражения не компилирует его заново.
+        Если выражение не удается скомпилировать или выполнить (например,
+        из-за ограничения на степень), значение вычисляется через evaluate,
+        который и сообщает об ошибке
+        """
+        if self.ast is None:
+            return self.evaluate()
         
-        # Функция pow (возведение в степень)
-        elif node_type == 'pow':
-            base = self.evaluate(node[1])
-            exponent = self.evaluate(node[2])
+        try:
+            code = _compile_expr(self._source())
+            return int(eval(code, {'__builtins__': {}, '_pow': _checked_pow}))
+        except (ArithmeticError, SyntaxError, RecursionError, MemoryError, ValueError):
+            return self.evaluate()
+    
+    def _source(self):
+        """
+        Текст выражения Python, эквивалентного AST.
+        Один проход с явным стеком: в стек кладутся готовые фрагменты текста
+        и еще не развернутые узлы, фрагменты собираются в список и
+        склеиваются один раз. Листья переводятся в текст сразу, без
+        отдельного шага обхода. Скобки ставятся только там, где их требуют
+        приоритеты. Степень с известным показателем (INT <= 1000)
+        записывается как **, остальные - вызовом _pow с проверками
+        """
+        out = []
+        append = out.append
+        stack = [self.ast]
+        push = stack.append
+        pop = stack.pop
+        while stack:
+            item = pop()
+            if item.__class__ is str:
+                append(item)
+                continue
             
-            if base is None or exponent is None:
-                return None
+            node_type = item[0]
+            if node_type == '+':
+                prec = _PY_PREC_ADD
+            elif node_type == '*':
+                prec = _PY_PREC_MUL
+            elif node_type == 'INT':
+                append(str(item[1]))
+                continue
+            elif node_type == 'pow':
+                prec = _py_prec(item)
+            else:
+                raise ValueError(f"Неизвестный тип узла: {node_type}")
             
-            # Проверка на отрицательные значения
-            if base < 0 or exponent < 0:
-                self.errors.append(f"[СЕМАНТИКА] Отрицательные аргументы в pow: pow({base}, {exponent})")
-                return None
+            left, right = item[1], item[2]
+            if prec == _PY_PREC_ATOM:
+                # pow с проверяемым показателем: _pow(left, right)
+                stack.extend((")", right, ", ", left, "_pow("))
+                continue
             
-            # Проверка на слишком большие значения
-            if exponent > 1000:  # Практическое ограничение
-                self.errors.append(f"[СЕМАНТИКА] Слишком большая степень: {exponent}")
-                return None
+            # Лист записывается без скобок при любом приоритете
+            left_leaf = left[0] == 'INT'
+            right_leaf = right[0] == 'INT'
+            if node_type == 'pow':
+                sign = "**"
+                wrap_left = not left_leaf and _py_prec(left) <= prec
+                wrap_right = False
+            else:
+                sign = node_type
+                wrap_left = not left_leaf and _py_prec(left) < prec
+                wrap_right = not right_leaf and _py_prec(right) <= prec
             
-            try:
-                result = pow(base, exponent)
-                if result < 0:
-                    self.errors.append(f"[СЕМАНТИКА] Отрицательный результат pow: pow({base}, {exponent})")
-                    return None
-                return result
-            except OverflowError:
-                self.errors.append(f"[СЕМАНТИКА] Переполнение при возведении в степень: pow({base}, {exponent})")
-                return None
+            # Фрагменты кладутся в обратном порядке, чтобы левый вышел первым
+            if right_leaf:
+                push(sign + str(right[1]))
+            elif wrap_right:
+                stack.extend((")", right, sign + "("))
+            else:
+                push(right)
+                push(sign)
+            if left_leaf:
+                push(str(left[1]))
+            elif wrap_left:
+                stack.extend((")", left, "("))
+            else:
+                push(left)
         
-        else:
-            self.errors.append(f"[СЕМАНТИКА] Неизвестный тип узла: {node_type}")
-            return None
+        return "".join(out)
     
     def print_ast(self, node=None, indent=0):
         """
-        Красивый вывод AST дерева
+        Красивый вывод AST дерева.
+        Обход в глубину с явным стеком, строки собираются в буфер и выводятся разом
         """
         if node is None:
             node = self.ast
@@ -454,22 +691,90 @@ class SemanticAnalyzer:
         if node is None:
             return
         
-        node_type = node[0]
+        lines = []
+        stack = [(node, indent)]
+        while stack:
+            node, depth = stack.pop()
+            node_type = node[0]
+            pad = _INDENTS[depth] if depth < len(_INDENTS) else "  " * depth
+            
+            if node_type == 'INT':
+                lines.append(pad + f"INT: {node[1]}")
+                continue
+            
+            label = _AST_LABELS.get(node_type)
+            if label is None:
+                continue
+            lines.append(pad + label)
+            
+            # Правый потомок кладется первым, чтобы левый был выведен раньше
+            stack.append((node[2], depth + 1))
+            stack.append((node[1], depth + 1))
         
-        if node_type == 'INT':
-            print("  " * indent + f"INT: {node[1]}")
-        elif node_type == '+':
-            print("  " * indent + "ADD (+)")
-            self.print_ast(node[1], indent + 1)
-            self.print_ast(node[2], indent + 1)
-        elif node_type == '*':
-            print("  " * indent + "MULT (*)")
-            self.print_ast(node[1], indent + 1)
-            self.print_ast(node[2], indent + 1)
-        elif node_type == 'pow':
-            print("  " * indent + "POW")
-            self.print_ast(node[1], indent + 1)
-            self.print_ast(node[2], indent + 1)
+        print("\n".join(lines))
+    
+    def print_errors(self):
+        """Вывод семантических ошибок"""
+        for error in self.errors:
+            print(error)
+
+class Evaluator:
+    """Стековая машина для вычисления выражения по линейному коду парсера"""
+    
+    def __init__(self, code):
+        self.code = code          # список пар (код операции, аргумент) в постфиксном порядке
+        self.errors = []
+    
+    def run(self):
+        """
+        Вычисление значения одним циклом по коду, без рекурсии
+        """
+        if not self.code:
+            self.errors.append("[СЕМАНТИКА] Пустой код выражения")
+            return None
+        
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        saved = {}                # номер ячейки -> результат общего поддерева
+        
+        for opcode, arg in self.code:
+            if opcode == OP_PUSH:
+                push(arg)
+                continue
+            if opcode == OP_LOAD:
+                push(saved[arg])
+                continue
+            
+            right_val = pop()
+            left_val = pop()
+            
+            if opcode >= len(_OPCODE_TYPES):
+                self.errors.append(f"[СЕМАНТИКА] Неизвестный код операции: {opcode}")
+                return None
+            
+            # Ошибка в операнде уже учтена: результат тоже отсутствует,
+            # но вычисление продолжается, чтобы сообщить обо всех ошибках
+            if left_val is None or right_val is None:
+                result = None
+            # Сумма и произведение неотрицательных чисел не дают ошибок
+            elif opcode == OP_ADD:
+                result = left_val + right_val
+            elif opcode == OP_MUL:
+                result = left_val * right_val
+            else:
+                result, error = _compute(_OPCODE_TYPES[opcode], left_val, right_val)
+                if error is not None:
+                    self.errors.append(f"[СЕМАНТИКА] {error}")
+            
+            # Аргумент операции - ячейка для результата, если поддерево встречается повторно
+            if arg is not None:
+                saved[arg] = result
+            push(result)
+        
+        if self.errors:
+            return None
+        return int(stack.pop())
     
     def print_errors(self):
         """Вывод семантических ошибок"""
@@ -480,6 +785,52 @@ class SemanticAnalyzer:
 # 4. ОСНОВНАЯ ПРОГРАММА
 # =============================================
 
+@lru_cache(maxsize=1024)
+def translate(source):
+    """
+    Полная трансляция выражения без вывода на экран: сканер, парсер
+    со сверткой констант и вычисление по линейному коду.
+    Возвращает пару (значение или None, кортеж сообщений об ошибках).
+    Результаты кэшируются, повторный запрос того же выражения не пересчитывается
+    """
+    scanner = Scanner(source)
+    tokens = scanner.scan()
+    if scanner.errors:
+        return None, tuple(scanner.errors)
+    
+    parser = Parser(tokens)
+    parser.parse()
+    if parser.errors:
+        return None, tuple(parser.errors)
+    
+    evaluator = Evaluator(parser.code)
+    result = evaluator.run()
+    if evaluator.errors:
+        return None, tuple(evaluator.errors)
+    return result, ()
+
+def _translate_compiled(source):
+    """
+    Трансляция с вычислением через SemanticAnalyzer.compile (байткод Python).
+    Свертка констант отключена, чтобы в байткод попадало все выражение.
+    Возвращает пару (значение или None, кортеж сообщений об ошибках)
+    """
+    scanner = Scanner(source)
+    tokens = scanner.scan()
+    if scanner.errors:
+        return None, tuple(scanner.errors)
+    
+    parser = Parser(tokens, fold=False)
+    ast = parser.parse()
+    if parser.errors:
+        return None, tuple(parser.errors)
+    
+    semantic = SemanticAnalyzer(ast)
+    result = semantic.compile()
+    if semantic.errors:
+        return None, tuple(semantic.errors)
+    return result, ()
+
 def main():
     """Основная функция программы"""
     
@@ -542,7 +893,8 @@ def main():
     print("2. СИНТАКСИЧЕСКИЙ АНАЛИЗ (ПАРСЕР)")
     print("=" * 60)
     
-    parser = Parser(tokens)
+    # Свертка констант отключена, чтобы AST отражало исходное выражение
+    parser = Parser(tokens, fold=False)
     ast = parser.parse()
     
     if parser.errors:
@@ -563,13 +915,14 @@ def main():
     # Вывод AST
     semantic.print_ast()
     
-    # Вычисление значения
+    # Вычисление значения по линейному коду парсера
     print("\nВычисление значения выражения:")
-    result = semantic.evaluate()
+    evaluator = Evaluator(parser.code)
+    result = evaluator.run()
     
-    if semantic.errors:
+    if evaluator.errors:
         print("Обнаружены семантические ошибки:")
-        semantic.print_errors()
+        evaluator.print_errors()
     elif result is not None:
         print(f"\n✓ РЕЗУЛЬТАТ: {result}")
         
@@ -602,14 +955,22 @@ def main():
 def run_tests():
     """Функция для тестирования транслятора"""
     test_cases = [
-        # (выражение, ожидаемый результат)
+        # (выражение, ожидаемый результат или кортеж ожидаемых сообщений об ошибках)
         ("7", 7),
         ("4+5*6", 34),  # 4 + (5*6) = 34
         ("pow(10,2)", 100),
-        ("pow(2,pow(3,4))", 2 ** (3 ** 4)),
+        ("pow(2,pow(3,4))", 2 ** (3 ** 4)),  # в байткоде: вызов _pow
         ("pow(1+3,2*5)+9", (1+3) ** (2*5) + 9),
         ("2*3+4*5", 26),  # (2*3) + (4*5) = 6 + 20 = 26
         ("pow(2,3)*4", 32),  # 8 * 4 = 32
+        ("pow(pow(2,3),2)", 64),  # в байткоде: (2**3)**2
+        # Ошибка в _pow: байткод откатывается к evaluate
+        ("pow(2,pow(10,4))", ("[СЕМАНТИКА] Слишком большая степень: 10000",)),
+        # Общее поддерево вычисляется один раз - и ошибка в нем сообщается один раз
+        ("pow(2,1001)*pow(2,1001)", ("[СЕМАНТИКА] Слишком большая степень: 1001",)),
+        # Сообщается о каждой ошибке, а не только о первой
+        ("pow(2,1001)+pow(3,1002)", ("[СЕМАНТИКА] Слишком большая степень: 1001",
+                                     "[СЕМАНТИКА] Слишком большая степень: 1002")),
     ]
     
     print("=" * 60)
@@ -623,36 +984,24 @@ def run_tests():
         print(f"\nТест {i}: {expr}")
         print(f"Ожидаемый результат: {expected}")
         
-        # Лексический анализ
-        scanner = Scanner(expr)
-        tokens = scanner.scan()
-        
-        if scanner.errors:
-            print(f"  ✗ Ошибка сканера: {scanner.errors[0]}")
-            failed += 1
-            continue
-        
-        # Синтаксический анализ
-        parser = Parser(tokens)
-        ast = parser.parse()
-        
-        if parser.errors:
-            print(f"  ✗ Ошибка парсера: {parser.errors[0]}")
-            failed += 1
-            continue
-        
-        # Семантический анализ
-        semantic = SemanticAnalyzer(ast)
-        result = semantic.evaluate()
+        # Выражение вычисляется обоими способами, результаты должны совпасть с ожидаемым
+        ok = True
+        for method, (result, errors) in (("линейный код", translate(expr)),
+                                         ("байткод Python", _translate_compiled(expr))):
+            actual = errors if errors else result
+            if actual == expected:
+                continue
+            ok = False
+            if errors and not isinstance(expected, tuple):
+                # Префикс сообщения ([СКАНЕР], [СИНТАКСИС], [СЕМАНТИКА]) указывает этап
+                print(f"  ✗ Ошибка ({method}): {errors[0]}")
+            else:
+                print(f"  ✗ Несоответствие ({method}): получено {actual}, ожидалось {expected}")
         
-        if semantic.errors:
-            print(f"  ✗ Семантическая ошибка: {semantic.errors[0]}")
-            failed += 1
-        elif result == expected:
-            print(f"  ✓ Успех: {result}")
+        if ok:
+            print(f"  ✓ Успех: {expected}")
             passed += 1
         else:
-            print(f"  ✗ Несоответствие: получено {result}, ожидалось {expected}")
             failed += 1
     
     print("\n" + "=" * 60)